@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Shared font cache for renderers
+Each (path, size) pair is parsed by FreeType once per process and the
+resulting ImageFont is reused by every view
+"""
+
+from typing import Dict
+from PIL import ImageFont
+
+_cache = {}
+
+def get_font(path: str, size: int):
+    """Load a font once per (path, size), falling back to the default"""
+    key = (path, size)
+    font = _cache.get(key)
+    if font is None:
+        try:
+            font = ImageFont.truetype(path, size)
+        except Exception:
+            font = ImageFont.load_default()
+        _cache[key] = font
+    return font
+
+def get_fonts(paths: Dict[str, str], sizes: Dict[str, int]) -> Dict:
+    """Build a role -> font dict from parallel path and size tables"""
+    return {name: get_font(path, sizes.get(name, 12)) for name, path in paths.items()}
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Shared constants and helpers for the monthly renderers
+Both monthly views draw the same grid and aggregate hours the same
+way; keeping one copy here means their caches and any kernel
+optimizations are shared too
+"""
+
+from PIL import Image, ImageDraw
+from datetime import datetime, timedelta
+from functools import lru_cache
+import numpy as np
+from typing import Dict, List
+
+from renderers._fontcache import get_fonts
+
+__all__ = [
+    'EPD_WIDTH', 'EPD_HEIGHT',
+    'TITLE_FONT_SIZE', 'TITLE_PADDING', 'HEADER_FONT_SIZE',
+    'CELL_FONT_SIZE', 'PANEL_MARGIN', 'HEADER_HEIGHT', 'TITLE_HEIGHT',
+    'CELL_SPACING', 'FONT_PATHS', 'WHITE', 'BLACK', 'GRAY_LEVEL_3',
+    'days_in_month', 'calculate_hours_from_tasks', 'load_fonts',
+    'day_cell_rect', 'build_skeleton', 'day_glyph_mask',
+]
+
+# Display dimensions
+EPD_WIDTH = 800
+EPD_HEIGHT = 480
+
+# Layout parameters
+TITLE_FONT_SIZE = 20
+TITLE_PADDING = 15
+HEADER_FONT_SIZE = 14
+CELL_FONT_SIZE = 14
+PANEL_MARGIN = 8
+HEADER_HEIGHT = 26
+TITLE_HEIGHT = 28
+CELL_SPACING = 2
+
+FONT_PATHS = {
+    'title': "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    'header': "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    'cell': "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+}
+
+# Colors
+WHITE = 255
+BLACK = 0
+GRAY_LEVEL_3 = 192
+
+def days_in_month(dt):
+    """Get number of days in a month"""
+    first_day = dt.replace(day=1)
+    next_month = first_day.replace(day=28) + timedelta(days=4)
+    last_day = next_month - timedelta(days=next_month.day)
+    return last_day.day
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; the plain kernel is fine without it
+    njit = None
+
+def _aggregate_minutes(days, start_minutes, end_minutes, out):
+    """Accumulate per-task durations (in hours) into the day-indexed output"""
+    for i in range(days.shape[0]):
+        day = days[i]
+        if day == 0:
+            continue
+        diff = end_minutes[i] - start_minutes[i]
+        if diff < 0:
+            diff += 1440
+        out[day] += diff / 60.0
+
+if njit is not None:
+    _aggregate_minutes = njit(cache=True)(_aggregate_minutes)
+
+def calculate_hours_from_tasks(todos: List[Dict], month_date: datetime) -> np.ndarray:
+    """Calculate total hours per day from API tasks, indexed by day number"""
+    # Cheap pre-screen: a task in this month must carry this prefix,
+    # so everything else skips the field parsing entirely
+    month_prefix = month_date.strftime('%Y-%m-')
+    
+    # Parse the string fields into typed arrays; the numeric
+    # accumulation then runs as a compiled kernel when numba is around
+    count = len(todos)
+    days = np.zeros(count, dtype=np.int32)
+    start_minutes = np.zeros(count, dtype=np.int32)
+    end_minutes = np.zeros(count, dtype=np.int32)
+    
+    for i, task in enumerate(todos):
+        # Fully populated tasks are the common case, so index the
+        # fields directly and let the except handle the rest
+        try:
+            start_date = task['start_date']
+            if not start_date or not start_date.startswith(month_prefix):
+                continue
+            
+            # Fixed YYYY-MM-DD / HH:MM layouts; slicing the fields out
+            # avoids a strptime call and two splits per task
+            day = int(start_date[8:10])
+            if not 1 <= day <= 31:
+                continue
+            
+            start_time, end_time = task['start_time'], task['end_time']
+            start_minutes[i] = int(start_time[0:2]) * 60 + int(start_time[3:5])
+            end_minutes[i] = int(end_time[0:2]) * 60 + int(end_time[3:5])
+            days[i] = day
+        except (ValueError, KeyError, TypeError, AttributeError):
+            # Missing, None or malformed fields all land here
+            days[i] = 0
+            continue
+    
+    hours_by_day = np.zeros(32, dtype=np.float64)
+    _aggregate_minutes(days, start_minutes, end_minutes, hours_by_day)
+    return hours_by_day
+
+def load_fonts():
+    """Load fonts with fallback via the shared per-process cache"""
+    font_sizes = {
+        'title': TITLE_FONT_SIZE,
+        'header': HEADER_FONT_SIZE,
+        'cell': CELL_FONT_SIZE,
+    }
+    
+    return get_fonts(FONT_PATHS, font_sizes)
+
+# The panel layout is fixed, so the grid edge coordinates are too
+_GRID_TOP = TITLE_PADDING + TITLE_FONT_SIZE + 5
+_CELL_WIDTH = (EPD_WIDTH - 2 * PANEL_MARGIN) / 7
+_CELL_HEIGHT = (EPD_HEIGHT - _GRID_TOP - PANEL_MARGIN - HEADER_HEIGHT) / 6
+_COL_EDGES = [int(PANEL_MARGIN + c * _CELL_WIDTH) for c in range(8)]
+_ROW_EDGES = [int(_GRID_TOP + HEADER_HEIGHT + r * _CELL_HEIGHT) for r in range(7)]
+
+def day_cell_rect(first_weekday, day):
+    """Pixel rectangle of a day cell in the 7x6 month grid"""
+    offset = first_weekday + (day - 1)
+    row, col = divmod(offset, 7)
+    return [
+        _COL_EDGES[col] + CELL_SPACING,
+        _ROW_EDGES[row] + CELL_SPACING,
+        _COL_EDGES[col + 1] - CELL_SPACING,
+        _ROW_EDGES[row + 1] - CELL_SPACING
+    ]
+
+_DAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+_day_name_widths = None
+
+def _get_day_name_widths():
+    """Header day-name widths, measured once after the first font load"""
+    global _day_name_widths
+    if _day_name_widths is None:
+        font = load_fonts()['header']
+        _day_name_widths = [font.getlength(name) for name in _DAY_NAMES]
+    return _day_name_widths
+
+@lru_cache(maxsize=64)
+def day_glyph_mask(day):
+    """
+    Rasterized mask of a day numeral (255 where ink goes). Pasting a
+    color through it skips re-running FreeType for the same 1-31
+    strings on every build.
+    """
+    font = load_fonts()['cell']
+    label = str(day)
+    bbox = font.getbbox(label)
+    mask = Image.new('L', (max(bbox[2], 1), max(bbox[3], 1)), 0)
+    ImageDraw.Draw(mask).text((0, 0), label, font=font, fill=255)
+    return mask
+
+@lru_cache(maxsize=4)
+def build_skeleton(year, month, display_mode):
+    """
+    Static month chrome: title, day-of-week headers, cell rectangles
+    and day numbers. Only changes when the month (or mode) does, so it
+    is cached and renders start from a cheap copy of it.
+    """
+    first_day = datetime(year, month, 1)
+    total_days = days_in_month(first_day)
+    first_weekday = first_day.weekday()
+    month_title = first_day.strftime("%B %Y")
+    fonts = load_fonts()
+    
+    if display_mode == 'bw':
+        # 1-bit canvas: an eighth of the memory traffic of 'L' for
+        # every draw and copy; renderers convert to 'L' on return
+        image = Image.new('1', (EPD_WIDTH, EPD_HEIGHT), 1)
+    else:
+        # Paint the gray day cells straight into a pixel buffer; slice
+        # stores replace 31 draw.rectangle round-trips
+        arr = np.full((EPD_HEIGHT, EPD_WIDTH), WHITE, dtype=np.uint8)
+        for day in range(1, total_days + 1):
+            rect = day_cell_rect(first_weekday, day)
+            arr[rect[1]:rect[3] + 1, rect[0]:rect[2] + 1] = GRAY_LEVEL_3
+        image = Image.fromarray(arr, 'L')
+    draw = ImageDraw.Draw(image)
+    
+    # Title
+    title_x = (EPD_WIDTH - int(fonts['title'].getlength(month_title))) // 2
+    draw.text((title_x, TITLE_PADDING), month_title, font=fonts['title'], fill=BLACK)
+    
+    # Day-of-week headers, centered with the pre-measured widths
+    day_name_widths = _get_day_name_widths()
+    for i, day_name in enumerate(_DAY_NAMES):
+        x = PANEL_MARGIN + i * _CELL_WIDTH
+        text_x = x + (_CELL_WIDTH - day_name_widths[i]) // 2
+        draw.text((text_x, _GRID_TOP), day_name, font=fonts['header'], fill=BLACK)
+    
+    # Cell outlines (bw only; gray fills are already in the buffer)
+    # and day numbers. Days with tasks are overdrawn by the renderers
+    # (bw fills them black with a white numeral).
+    for day in range(1, total_days + 1):
+        rect = day_cell_rect(first_weekday, day)
+        if display_mode == 'bw':
+            draw.rectangle(rect, outline=BLACK, width=1)
+        image.paste(BLACK, (rect[0] + 4, rect[1] + 2), day_glyph_mask(day))
+    
+    return image
@@ -38,12 +38,16 @@ BLACK = 0
 GRAY_LEVEL_1 = 80
 GRAY_LEVEL_3 = 192
 
+# Days per month (index 0 unused), February handled separately
+_DAYS_PER_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
 def days_in_month(dt):
     """Get number of days in a month"""
-    first_day = dt.replace(day=1)
-    next_month = first_day.replace(day=28) + timedelta(days=4)
-    last_day = next_month - timedelta(days=next_month.day)
-    return last_day.day
+    month = dt.month
+    if month != 2:
+        return _DAYS_PER_MONTH[month]
+    year = dt.year
+    return 29 if (year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)) else 28
 
 def calculate_hours_from_tasks(todos: List[Dict], month_date: datetime) -> Dict[int, float]:
     """Calculate total hours per day from API tasks"""
@@ -99,6 +103,176 @@ def load_fonts():
     
     return fonts
 
+def _parse_date(value):
+    """Parse a 'YYYY-MM-DD' string to a date, or None if invalid"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (ValueError, TypeError):
+        return None
+
+def _instance_is_current(instance, today_date):
+    """Check that an instance is not deleted and falls on today or later"""
+    if instance['deleted_at'] or not instance['instance_date']:
+        return False
+    instance_date = _parse_date(instance['instance_date'])
+    return instance_date is not None and instance_date >= today_date
+
+def _classify_todos(todos: List[Dict], today_date) -> tuple:
+    """Split todos into (daily, today, upcoming) lists of up to 3 titles each"""
+    daily_todos = []
+    today_todos = []
+    upcoming_todos = []
+
+    # Track seen tasks to avoid duplicates with one combined set:
+    # daily tasks key on ('d', parent_task_id), others on ('t', title)
+    seen = set()
+
+    # Track daily task parent_ids and their valid instances
+    # If all instances of a parent are deleted, don't show the task
+    daily_parent_instances = {}  # parent_id -> list of (instance_date, deleted_at)
+
+    # First pass: collect all daily task instances to check if parent is deleted
+    for task in todos:
+        section = task.get('section', '').lower()
+        if section == 'daily' and task.get('parent_task_id'):
+            parent_id = task.get('parent_task_id')
+            instance_date = task.get('instance_date')
+            deleted_at = task.get('deleted_at')
+            if parent_id not in daily_parent_instances:
+                daily_parent_instances[parent_id] = []
+            daily_parent_instances[parent_id].append({
+                'instance_date': instance_date,
+                'deleted_at': deleted_at,
+                'task': task
+            })
+
+    # Check which parent tasks should be shown (have at least one valid instance for today or future)
+    valid_daily_parent_ids = {
+        parent_id
+        for parent_id, instances in daily_parent_instances.items()
+        if any(_instance_is_current(instance, today_date) for instance in instances)
+    }
+
+    # Section name -> destination list; date-based fallback when absent
+    buckets = {'daily': daily_todos, 'today': today_todos, 'upcoming': upcoming_todos}
+
+    for task in todos:
+        title = task.get('title', 'Untitled')
+        if not title or title == 'Untitled':
+            continue
+
+        # Skip deleted tasks
+        if task.get('deleted_at'):
+            continue
+
+        # Skip completed tasks
+        completed = task.get('completed', False) or task.get('is_completed', False) or task.get('status') == 'completed'
+        if completed:
+            continue
+
+        # Check section early to determine if this is a daily task
+        # Handle None, empty string, or string values
+        section_raw = task.get('section')
+        if section_raw is None:
+            section = ''
+        else:
+            section = str(section_raw).lower().strip()
+        is_daily_task = (section == 'daily')
+
+        # For non-daily tasks, skip recurring task instances (they have instance_date and parent_task_id)
+        # For daily tasks, we want to include instances but deduplicate by parent_task_id
+        # Also, only show daily task instances for today or future dates, and only if parent has valid instances
+        if is_daily_task and task.get('instance_date') and task.get('parent_task_id'):
+            parent_id = task.get('parent_task_id')
+            # Skip if parent task has no valid future instances (all deleted or all past)
+            if parent_id not in valid_daily_parent_ids:
+                continue
+            # For daily tasks with instance_date, only show if instance_date is today or future
+            try:
+                instance_date = datetime.strptime(task['instance_date'], '%Y-%m-%d').date()
+                if instance_date < today_date:
+                    continue  # Skip past instances
+            except:
+                pass  # If parsing fails, continue with the task
+        elif not is_daily_task and task.get('instance_date') and task.get('parent_task_id'):
+            continue
+
+        # Separate TODO tasks from scheduled tasks using is_schedule
+        # TODO tasks: is_schedule = false OR no time
+        # Scheduled tasks: is_schedule = true AND has time (shown in calendar if in current month)
+
+        is_schedule = task.get('is_schedule', False)
+        start_time = task.get('start_time')
+        end_time = task.get('end_time')
+        has_time = start_time and end_time and start_time.strip() and end_time.strip() and start_time != 'null' and end_time != 'null'
+
+        # Parse task date for checking if it's in current month
+        task_date = None
+        if task.get('start_date'):
+            try:
+                task_date = datetime.strptime(task['start_date'], '%Y-%m-%d').date()
+            except:
+                pass
+
+        # Handle scheduled tasks (is_schedule = true AND has time)
+        if is_schedule and has_time:
+            # Scheduled tasks with section "upcoming" should always show in TODO
+            if section == 'upcoming':
+                pass  # Include in TODO
+            # Scheduled tasks in current month are shown in calendar, skip from TODO
+            elif task_date:
+                # Check if task is in current month
+                today_first = today_date.replace(day=1)
+                if today_first.month == 12:
+                    next_month = today_first.replace(year=today_first.year + 1, month=1)
+                else:
+                    next_month = today_first.replace(month=today_first.month + 1)
+                last_day = (next_month - timedelta(days=1)).day
+                month_start = today_first
+                month_end = today_first.replace(day=last_day)
+
+                if month_start <= task_date <= month_end:
+                    continue  # Task is in current month calendar, skip from TODO
+                # Task is outside current month, include in TODO
+            else:
+                # Scheduled task with no date, skip from TODO (can't show in calendar)
+                continue
+
+        # All remaining tasks are TODO tasks (is_schedule = false OR no time)
+        # Categorize by section first, then by date
+
+        # Deduplicate: for daily tasks, key on parent_task_id; for others
+        # (and daily tasks without a parent_id), fall back to the title
+        parent_id = task.get('parent_task_id')
+        if is_daily_task and parent_id:
+            key = ('d', parent_id)
+        else:
+            key = ('t', title)
+        if key in seen:
+            continue
+        seen.add(key)
+
+        # Categorize by section - section takes priority over date-based categorization
+        bucket = buckets.get(section)
+        if bucket is not None:
+            bucket.append(title)
+            continue
+
+        # No section, categorize by date (task_date was already parsed above)
+        if task_date:
+            if task_date == today_date:
+                today_todos.append(title)
+            elif task_date > today_date:
+                upcoming_todos.append(title)
+            else:
+                daily_todos.append(title)
+        else:
+            # No date, treat as daily
+            daily_todos.append(title)
+
+    # Limit to 3 items per section
+    return daily_todos[:3], today_todos[:3], upcoming_todos[:3]
+
 def render_dual_monthly(data: Dict[str, Any], config: Dict[str, Any]) -> Image.Image:
     """
     Render dual-pane monthly calendar view with TODO panel
@@ -160,6 +334,17 @@ def render_dual_monthly(data: Dict[str, Any], config: Dict[str, Any]) -> Image.I
         text_y = grid_top + (HEADER_HEIGHT - text_h) // 2
         draw.text((text_x, text_y), day_name, font=fonts['header'], fill=BLACK)
     
+    # Pre-render the cell background once; every cell shares the same
+    # geometry, so pasting a template tile replaces 31 rectangle draws
+    tile_w = max(1, int(cell_width) - 2 * CELL_SPACING)
+    tile_h = max(1, int(cell_height) - 2 * CELL_SPACING)
+    if display_mode == 'bw':
+        filled_tile = Image.new('L', (tile_w, tile_h), BLACK)
+        outlined_tile = Image.new('L', (tile_w, tile_h), WHITE)
+        ImageDraw.Draw(outlined_tile).rectangle([0, 0, tile_w - 1, tile_h - 1], outline=BLACK, width=1)
+    else:
+        cell_tile = Image.new('L', (tile_w, tile_h), GRAY_LEVEL_3)
+
     # Draw calendar cells
     start_y = grid_top + HEADER_HEIGHT
     for day in range(1, total_days + 1):
@@ -180,16 +365,13 @@ def render_dual_monthly(data: Dict[str, Any], config: Dict[str, Any]) -> Image.I
             int(y1) - CELL_SPACING
         ]
         
-        # Draw calendar cell based on mode
+        # Paste the pre-rendered cell background based on mode
         if display_mode == 'bw':
             # Black and white mode: fill with black if has tasks
-            if hours > 0:
-                draw.rectangle(rect, fill=BLACK, outline=BLACK, width=1)
-            else:
-                draw.rectangle(rect, outline=BLACK, width=1)
+            image.paste(filled_tile if hours > 0 else outlined_tile, (rect[0], rect[1]))
         else:
             # 4-gray mode: use fill only (like before)
-            draw.rectangle(rect, fill=GRAY_LEVEL_3, outline=None)
+            image.paste(cell_tile, (rect[0], rect[1]))
         
         # Day number
         day_label = str(day)
@@ -238,184 +420,7 @@ def render_dual_monthly(data: Dict[str, Any], config: Dict[str, Any]) -> Image.I
     
     # TODO sections - extract tasks from todos
     today_date = today.date()
-    daily_todos = []
-    today_todos = []
-    upcoming_todos = []
-    
-    # Track seen tasks to avoid duplicates
-    # For daily tasks, use parent_task_id; for others, use title
-    seen_daily_parent_ids = set()
-    seen_titles = set()
-    
-    # Track daily task parent_ids and their valid instances
-    # If all instances of a parent are deleted, don't show the task
-    daily_parent_instances = {}  # parent_id -> list of (instance_date, deleted_at)
-    
-    # First pass: collect all daily task instances to check if parent is deleted
-    for task in todos:
-        section = task.get('section', '').lower()
-        if section == 'daily' and task.get('parent_task_id'):
-            parent_id = task.get('parent_task_id')
-            instance_date = task.get('instance_date')
-            deleted_at = task.get('deleted_at')
-            if parent_id not in daily_parent_instances:
-                daily_parent_instances[parent_id] = []
-            daily_parent_instances[parent_id].append({
-                'instance_date': instance_date,
-                'deleted_at': deleted_at,
-                'task': task
-            })
-    
-    # Check which parent tasks should be shown (have at least one valid instance for today or future)
-    valid_daily_parent_ids = set()
-    for parent_id, instances in daily_parent_instances.items():
-        has_valid_future_instance = False
-        for instance in instances:
-            # Skip if instance is deleted
-            if instance['deleted_at']:
-                continue
-            # Check if instance_date is today or future
-            if instance['instance_date']:
-                try:
-                    instance_date = datetime.strptime(instance['instance_date'], '%Y-%m-%d').date()
-                    if instance_date >= today_date:
-                        has_valid_future_instance = True
-                        break
-                except:
-                    pass
-        if has_valid_future_instance:
-            valid_daily_parent_ids.add(parent_id)
-    
-    for task in todos:
-        title = task.get('title', 'Untitled')
-        if not title or title == 'Untitled':
-            continue
-        
-        # Skip deleted tasks
-        if task.get('deleted_at'):
-            continue
-        
-        # Skip completed tasks
-        completed = task.get('completed', False) or task.get('is_completed', False) or task.get('status') == 'completed'
-        if completed:
-            continue
-        
-        # Check section early to determine if this is a daily task
-        # Handle None, empty string, or string values
-        section_raw = task.get('section')
-        if section_raw is None:
-            section = ''
-        else:
-            section = str(section_raw).lower().strip()
-        is_daily_task = (section == 'daily')
-        
-        # For non-daily tasks, skip recurring task instances (they have instance_date and parent_task_id)
-        # For daily tasks, we want to include instances but deduplicate by parent_task_id
-        # Also, only show daily task instances for today or future dates, and only if parent has valid instances
-        if is_daily_task and task.get('instance_date') and task.get('parent_task_id'):
-            parent_id = task.get('parent_task_id')
-            # Skip if parent task has no valid future instances (all deleted or all past)
-            if parent_id not in valid_daily_parent_ids:
-                continue
-            # For daily tasks with instance_date, only show if instance_date is today or future
-            try:
-                instance_date = datetime.strptime(task['instance_date'], '%Y-%m-%d').date()
-                if instance_date < today_date:
-                    continue  # Skip past instances
-            except:
-                pass  # If parsing fails, continue with the task
-        elif not is_daily_task and task.get('instance_date') and task.get('parent_task_id'):
-            continue
-        
-        # Separate TODO tasks from scheduled tasks using is_schedule
-        # TODO tasks: is_schedule = false OR no time
-        # Scheduled tasks: is_schedule = true AND has time (shown in calendar if in current month)
-        
-        is_schedule = task.get('is_schedule', False)
-        start_time = task.get('start_time')
-        end_time = task.get('end_time')
-        has_time = start_time and end_time and start_time.strip() and end_time.strip() and start_time != 'null' and end_time != 'null'
-        
-        # Parse task date for checking if it's in current month
-        task_date = None
-        if task.get('start_date'):
-            try:
-                task_date = datetime.strptime(task['start_date'], '%Y-%m-%d').date()
-            except:
-                pass
-        
-        # Handle scheduled tasks (is_schedule = true AND has time)
-        if is_schedule and has_time:
-            # Scheduled tasks with section "upcoming" should always show in TODO
-            if section == 'upcoming':
-                pass  # Include in TODO
-            # Scheduled tasks in current month are shown in calendar, skip from TODO
-            elif task_date:
-                # Check if task is in current month
-                today_first = today_date.replace(day=1)
-                if today_first.month == 12:
-                    next_month = today_first.replace(year=today_first.year + 1, month=1)
-                else:
-                    next_month = today_first.replace(month=today_first.month + 1)
-                last_day = (next_month - timedelta(days=1)).day
-                month_start = today_first
-                month_end = today_first.replace(day=last_day)
-                
-                if month_start <= task_date <= month_end:
-                    continue  # Task is in current month calendar, skip from TODO
-                # Task is outside current month, include in TODO
-            else:
-                # Scheduled task with no date, skip from TODO (can't show in calendar)
-                continue
-        
-        # All remaining tasks are TODO tasks (is_schedule = false OR no time)
-        # Categorize by section first, then by date
-        
-        # Deduplicate: for daily tasks, use parent_task_id; for others, use title
-        if is_daily_task:
-            # For daily tasks, use parent_task_id for deduplication
-            parent_id = task.get('parent_task_id')
-            if parent_id:
-                if parent_id in seen_daily_parent_ids:
-                    continue
-                seen_daily_parent_ids.add(parent_id)
-            else:
-                # Fallback to title if no parent_id
-                if title in seen_titles:
-                    continue
-                seen_titles.add(title)
-        else:
-            # For non-daily tasks, use title for deduplication
-            if title in seen_titles:
-                continue
-            seen_titles.add(title)
-        
-        # Categorize by section - section takes priority over date-based categorization
-        if section == 'daily':
-            daily_todos.append(title)
-        elif section == 'today':
-            today_todos.append(title)
-        elif section == 'upcoming':
-            upcoming_todos.append(title)
-        else:
-            # No section, categorize by date
-            # Reuse task_date if already parsed, otherwise parse it
-            if task_date is None and task.get('start_date'):
-                try:
-                    task_date = datetime.strptime(task['start_date'], '%Y-%m-%d').date()
-                except:
-                    pass
-            
-            if task_date:
-                if task_date == today_date:
-                    today_todos.append(title)
-                elif task_date > today_date:
-                    upcoming_todos.append(title)
-                else:
-                    daily_todos.append(title)
-            else:
-                # No date, treat as daily
-                daily_todos.append(title)
+    daily_todos, today_todos, upcoming_todos = _classify_todos(todos, today_date)
     
     sections = [
         ("Daily", daily_todos[:3]),  # Limit to 3 items per section
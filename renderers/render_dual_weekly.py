@@ -4,10 +4,13 @@ Dual Weekly View Renderer
 Weekly timetable with TODO panel and datetime
 """
 
-from PIL import Image, ImageDraw, ImageFont
-from datetime import datetime, timedelta
+from PIL import Image, ImageDraw
+from datetime import date, datetime, timedelta
+import numpy as np
 from typing import Dict, List, Any
 
+from renderers._fontcache import get_fonts
+
 # Display dimensions
 EPD_WIDTH = 800
 EPD_HEIGHT = 480
@@ -38,20 +41,34 @@ TIME_END_HOUR = 24
 TIME_LABEL_X = 6
 TIME_LABEL_Y_OFFSET = 4
 
+# Half-hour grid rows, fixed by TIME_START_HOUR/TIME_END_HOUR
+_TIME_SLOTS = []
+_TIME_LABELS = {}
+for _hour in range(TIME_START_HOUR, TIME_END_HOUR):
+    _TIME_LABELS[len(_TIME_SLOTS)] = f"{_hour:02d}:00"
+    _TIME_SLOTS.append(f"{_hour:02d}:00")
+    _TIME_SLOTS.append(f"{_hour:02d}:30")
+if TIME_END_HOUR == 24:
+    _TIME_LABELS[len(_TIME_SLOTS)] = "00:00"
+    _TIME_SLOTS.append("00:00")
+
 # Colors
 WHITE = 255
 BLACK = 0
 GRAY_LEVEL_1 = 80
 GRAY_LEVEL_3 = 192
 
-def transform_tasks_to_weekly_format(api_todos: List[Dict], week_start_date: datetime) -> Dict[str, List]:
-    """Transform API tasks to weekly format"""
-    tasks_by_day = {
-        'Monday': [], 'Tuesday': [], 'Wednesday': [], 'Thursday': [],
-        'Friday': [], 'Saturday': [], 'Sunday': []
-    }
-    
-    day_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+def _parse_iso(value):
+    """Parse a fixed-layout YYYY-MM-DD string; far cheaper than strptime"""
+    return date(int(value[0:4]), int(value[5:7]), int(value[8:10]))
+
+def _hm(value):
+    """Parse a fixed-layout HH:MM string without the split allocation"""
+    return int(value[0:2]), int(value[3:5])
+
+def transform_tasks_to_weekly_format(api_todos: List[Dict], week_start_date: datetime) -> List[List[Dict]]:
+    """Transform API tasks to per-weekday lists indexed by date.weekday()"""
+    tasks_by_day = [[] for _ in range(7)]
     
     week_start = week_start_date.date() if isinstance(week_start_date, datetime) else week_start_date
     week_end = week_start + timedelta(days=6)
@@ -61,16 +78,13 @@ def transform_tasks_to_weekly_format(api_todos: List[Dict], week_start_date: dat
             continue
         
         try:
-            task_date = datetime.strptime(task['start_date'], '%Y-%m-%d').date()
-        except:
+            task_date = _parse_iso(task['start_date'])
+        except (ValueError, TypeError):
             continue
         
         if task_date < week_start or task_date > week_end:
             continue
         
-        day_index = task_date.weekday()
-        day_name = day_names[day_index]
-        
         start_time = task['start_time']
         end_time = task['end_time']
         if len(start_time) > 5:
@@ -80,15 +94,14 @@ def transform_tasks_to_weekly_format(api_todos: List[Dict], week_start_date: dat
         
         # Filter tasks: only include tasks within 8am-12am (08:00-00:00, 16 hours)
         try:
-            start_parts = start_time.split(':')
-            start_h = int(start_parts[0])
+            start_h, _ = _hm(start_time)
             # Skip tasks that start before 8am (8am to 12am midnight is included)
             if start_h < 8:
                 continue
-        except:
+        except (ValueError, TypeError):
             continue
         
-        tasks_by_day[day_name].append({
+        tasks_by_day[task_date.weekday()].append({
             'start_time': start_time,
             'end_time': end_time,
             'title': task.get('title', 'Untitled')
@@ -97,8 +110,7 @@ def transform_tasks_to_weekly_format(api_todos: List[Dict], week_start_date: dat
     return tasks_by_day
 
 def load_fonts():
-    """Load fonts with fallback"""
-    fonts = {}
+    """Load fonts with fallback via the shared per-process cache"""
     font_sizes = {
         'title': TITLE_FONT_SIZE,
         'day': DAY_FONT_SIZE,
@@ -107,14 +119,68 @@ def load_fonts():
         'datetime': DATETIME_FONT_SIZE,
     }
     
-    for name, path in FONT_PATHS.items():
-        size = font_sizes.get(name, 12)
-        try:
-            fonts[name] = ImageFont.truetype(path, size)
-        except:
-            fonts[name] = ImageFont.load_default()
-    
-    return fonts
+    return get_fonts(FONT_PATHS, font_sizes)
+
+# Pooled pixel buffer, reused across refreshes so the long-lived device
+# process does not reallocate a 384 KB canvas every minute. The display
+# loop renders serially, so no locking is needed.
+_canvas_pool = {}
+
+# Cached static chrome per display mode; the skeleton never changes
+# between refreshes, only the title, tasks, TODO items and date do
+_bg_cache = {}
+
+def _build_background(display_mode):
+    """Pre-render the static chrome: day headers, time labels, TODO box"""
+    fonts = load_fonts()
+    image = Image.new('L', (EPD_WIDTH, EPD_HEIGHT), WHITE)
+    draw = ImageDraw.Draw(image)
+
+    # Panels: left 60%, right 40%
+    left_width = int(EPD_WIDTH * 0.6)
+    right_x = left_width + PANEL_MARGIN
+    right_width = max(0, EPD_WIDTH - right_x - PANEL_MARGIN)
+
+    # Table area
+    table_start_y = HEADER_HEIGHT + TITLE_PADDING + TITLE_FONT_SIZE + 5
+    table_start_x = TIME_COL_WIDTH
+    table_width = left_width - table_start_x - PANEL_MARGIN
+    table_height = EPD_HEIGHT - table_start_y - TABLE_MARGIN_BOTTOM
+
+    day_names = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+    day_col_width = table_width // len(day_names)
+
+    # Day headers
+    for i, day_name in enumerate(day_names):
+        x = table_start_x + i * day_col_width
+        bbox = draw.textbbox((0, 0), day_name, font=fonts['day'])
+        text_w = bbox[2] - bbox[0]
+        text_h = bbox[3] - bbox[1]
+        text_x = x + (day_col_width - text_w) // 2
+        text_y = table_start_y + (HEADER_HEIGHT - text_h) // 2
+        draw.text((text_x, text_y), day_name, font=fonts['day'], fill=BLACK)
+
+    # Time labels
+    num_time_slots = (TIME_END_HOUR - TIME_START_HOUR) * 2 + (1 if TIME_END_HOUR == 24 else 0)
+    available_height = table_height - HEADER_HEIGHT
+    row_height = available_height / num_time_slots
+    for hour in range(TIME_START_HOUR, TIME_END_HOUR + 1):
+        label = "00:00" if hour == 24 else f"{hour:02d}:00"
+        if hour == 24 and TIME_END_HOUR != 24:
+            continue
+        slot_index = (hour - TIME_START_HOUR) * 2
+        y = int(table_start_y + HEADER_HEIGHT + slot_index * row_height)
+        draw.text((TIME_LABEL_X, y - TIME_LABEL_Y_OFFSET), label, font=fonts['time'], fill=BLACK)
+
+    # Right panel - TODO box outline and title
+    footer_h = DATETIME_FONT_SIZE + FOOTER_PADDING
+    usable_height = max(0, EPD_HEIGHT - table_start_y - PANEL_MARGIN - footer_h)
+    square_size = max(0, min(right_width - PANEL_MARGIN, usable_height))
+    square_rect = [right_x, table_start_y, right_x + square_size, table_start_y + square_size]
+    draw.rectangle(square_rect, outline=BLACK, width=1)
+    draw.text((square_rect[0] + 6, square_rect[1] + 6), "TODO", font=fonts['day'], fill=BLACK)
+
+    return image
 
 def render_dual_weekly(data: Dict[str, Any], config: Dict[str, Any]) -> Image.Image:
     """
@@ -140,18 +206,40 @@ def render_dual_weekly(data: Dict[str, Any], config: Dict[str, Any]) -> Image.Im
     
     width = EPD_WIDTH
     height = EPD_HEIGHT
-    image = Image.new('L', (width, height), WHITE)
-    draw = ImageDraw.Draw(image)
+    background = _bg_cache.get(display_mode)
+    if background is None:
+        # Cached as a pixel array so task fills can be written straight
+        # into a copy of the buffer without per-rectangle PIL calls
+        background = np.asarray(_build_background(display_mode), dtype=np.uint8)
+        _bg_cache[display_mode] = background
+    arr = _canvas_pool.get((height, width))
+    if arr is None:
+        arr = np.empty((height, width), dtype=np.uint8)
+        _canvas_pool[(height, width)] = arr
+    np.copyto(arr, background)
+    # Measurement-only draw until the fills are applied; the real image
+    # is materialized from the pixel buffer after the task loop
+    draw = ImageDraw.Draw(Image.new('L', (1, 1)))
+
+    # Per-render cache for text measurements; repeated strings (day
+    # headers, day numbers) otherwise re-run FreeType shaping each time
+    _bbox_cache = {}  # width per (font, text)
+
+    def text_width(text, font):
+        key = (id(font), text)
+        w = _bbox_cache.get(key)
+        if w is None:
+            w = draw.textlength(text, font=font)
+            _bbox_cache[key] = w
+        return w
     
     # Panels: left 60%, right 40%
     left_width = int(width * 0.6)
     right_x = left_width + PANEL_MARGIN
     right_width = max(0, width - right_x - PANEL_MARGIN)
     
-    # Title
-    bbox = draw.textbbox((0, 0), week_title, font=fonts['title'])
-    title_x = (width - (bbox[2] - bbox[0])) // 2
-    draw.text((title_x, TITLE_PADDING), week_title, font=fonts['title'], fill=BLACK)
+    # Title (drawn once the pixel buffer becomes an image)
+    title_x = (width - int(text_width(week_title, fonts['title']))) // 2
     
     # Table area
     table_start_y = HEADER_HEIGHT + TITLE_PADDING + TITLE_FONT_SIZE + 5
@@ -162,60 +250,30 @@ def render_dual_weekly(data: Dict[str, Any], config: Dict[str, Any]) -> Image.Im
     day_names = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
     day_col_width = table_width // len(day_names)
     
-    # Day headers
-    for i, day_name in enumerate(day_names):
-        x = table_start_x + i * day_col_width
-        bbox = draw.textbbox((0, 0), day_name, font=fonts['day'])
-        text_w = bbox[2] - bbox[0]
-        text_h = bbox[3] - bbox[1]
-        text_x = x + (day_col_width - text_w) // 2
-        text_y = table_start_y + (HEADER_HEIGHT - text_h) // 2
-        draw.text((text_x, text_y), day_name, font=fonts['day'], fill=BLACK)
-    
-    # Time slots
-    time_slots = []
-    time_labels = {}
-    for hour in range(TIME_START_HOUR, TIME_END_HOUR):
-        time_str = f"{hour:02d}:00"
-        time_slots.append(time_str)
-        time_labels[len(time_slots) - 1] = time_str
-        time_slots.append(f"{hour:02d}:30")
-    if TIME_END_HOUR == 24:
-        time_slots.append("00:00")
-        time_labels[len(time_slots) - 1] = "00:00"
-    
-    num_time_slots = len(time_slots)
+    # Day headers and time labels are part of the cached background
+
+    num_time_slots = len(_TIME_SLOTS)
     available_height = table_height - HEADER_HEIGHT
     row_height = available_height / num_time_slots
     
     
-    def time_to_slot_index(time_str):
-        try:
-            parts = time_str.split(':')
-            hour = int(parts[0])
-            minute = int(parts[1])
-            slot_index = (hour - TIME_START_HOUR) * 2
-            if minute >= 30:
-                slot_index += 1
-            return max(0, slot_index)
-        except:
-            return 0
+    # Buffer rectangles grouped by fill and the title draws, so each
+    # fill level goes down in one pass with the text layered on top
+    outline_rects = []
+    rects_by_fill = {}
+    text_jobs = []
     
-    # Draw tasks
-    day_name_map = {
-        'Monday': 'Mon', 'Tuesday': 'Tue', 'Wednesday': 'Wed', 'Thursday': 'Thu',
-        'Friday': 'Fri', 'Saturday': 'Sat', 'Sunday': 'Sun',
-        'Mon': 'Mon', 'Tue': 'Tue', 'Wed': 'Wed', 'Thu': 'Thu',
-        'Fri': 'Fri', 'Sat': 'Sat', 'Sun': 'Sun'
-    }
-    day_index_map = {day: i for i, day in enumerate(day_names)}
+    # Columns narrower than one glyph can never show a title; probe once
+    min_char_width = draw.textlength('M', font=fonts['task'])
     
-    for day_name, day_tasks in tasks.items():
-        short_day = day_name_map.get(day_name, day_name)
-        if short_day not in day_index_map:
-            continue
+    # Calendar titles are collected here so the TODO panel below can
+    # exclude tasks already visible in the grid without a second pass
+    calendar_task_titles = set()
+    
+    for day_index, day_tasks in enumerate(tasks):
+        for task in day_tasks:
+            calendar_task_titles.add(task.get('title', ''))
         
-        day_index = day_index_map[short_day]
         day_x = table_start_x + day_index * day_col_width
         
         for task in day_tasks:
@@ -225,23 +283,21 @@ def render_dual_weekly(data: Dict[str, Any], config: Dict[str, Any]) -> Image.Im
                 continue
             
             try:
-                start_parts = start_time.split(':')
-                end_parts = end_time.split(':')
-                start_h, start_m = int(start_parts[0]), int(start_parts[1])
-                end_h, end_m = int(end_parts[0]), int(end_parts[1])
+                start_h, start_m = _hm(start_time)
+                end_h, end_m = _hm(end_time)
                 start_minutes = start_h * 60 + start_m
                 end_minutes = end_h * 60 + end_m
                 if end_minutes < start_minutes:
                     end_minutes += 24 * 60
                 duration_hours = (end_minutes - start_minutes) / 60.0
-            except:
+            except (ValueError, TypeError):
                 continue
             
-            start_slot = time_to_slot_index(start_time)
-            end_slot = time_to_slot_index(end_time)
+            start_slot = max(0, (start_h - TIME_START_HOUR) * 2 + (start_m >= 30))
+            end_slot = max(0, (end_h - TIME_START_HOUR) * 2 + (end_m >= 30))
             
             if end_slot < start_slot:
-                end_slot = len(time_slots)
+                end_slot = num_time_slots
             
             # Ensure end_slot is at least start_slot + 1 to avoid invalid rectangle
             if end_slot <= start_slot:
@@ -262,43 +318,56 @@ def render_dual_weekly(data: Dict[str, Any], config: Dict[str, Any]) -> Image.Im
             if task_rect[3] <= task_rect[1]:
                 continue
             
-            # Draw task rectangle based on mode
+            # Queue task rectangle based on mode
             if display_mode == 'bw':
                 # Black and white mode: use outline only
-                draw.rectangle(task_rect, outline=BLACK, width=1)
+                outline_rects.append(task_rect)
             else:
                 # 4-gray mode: use fill only (like before)
                 if duration_hours <= 1.0:
-                    draw.rectangle(task_rect, fill=GRAY_LEVEL_3, outline=None)
+                    gray_level = GRAY_LEVEL_3
                 else:
                     gray_level = GRAY_LEVEL_1 if duration_hours > 3.0 else GRAY_LEVEL_3
-                    draw.rectangle(task_rect, fill=gray_level, outline=None)
+                rects_by_fill.setdefault(gray_level, []).append(task_rect)
             
             # Draw task title if there's enough space
-            task_title = task.get('title', '')
-            if task_title and (end_y - start_y) >= TASK_FONT_SIZE + 4:
+            task_title = task.get('title')
+            if not task_title:
+                continue  # rectangle queued; nothing to shape
+            max_text_width = task_rect[2] - task_rect[0] - 6
+            if (end_y - start_y) >= TASK_FONT_SIZE + 4 and max_text_width >= min_char_width:
                 text_x = task_rect[0] + 3
                 text_y = task_rect[1] + 2
-                max_text_width = task_rect[2] - task_rect[0] - 6
                 
-                bbox = draw.textbbox((0, 0), task_title, font=fonts['task'])
-                text_width = bbox[2] - bbox[0]
-                
-                if text_width > max_text_width:
-                    while text_width > max_text_width - 10 and len(task_title) > 0:
-                        task_title = task_title[:-1]
-                        bbox = draw.textbbox((0, 0), task_title + "...", font=fonts['task'])
-                        text_width = bbox[2] - bbox[0]
-                    task_title = task_title + "..."
+                title_width = draw.textlength(task_title, font=fonts['task'])
+
+                if title_width > max_text_width:
+                    # Binary-search the longest prefix that fits with an ellipsis
+                    suffix = "..."
+                    suffix_w = draw.textlength(suffix, font=fonts['task'])
+                    lo, hi = 0, len(task_title)
+                    while lo < hi:
+                        mid = (lo + hi + 1) // 2
+                        if draw.textlength(task_title[:mid], font=fonts['task']) + suffix_w <= max_text_width:
+                            lo = mid
+                        else:
+                            hi = mid - 1
+                    task_title = task_title[:lo] + suffix
                 
-                draw.text((text_x, text_y), task_title, font=fonts['task'], fill=BLACK)
-    
-    # Draw time labels
-    for i, time_str in enumerate(time_slots):
-        y = int(table_start_y + HEADER_HEIGHT + i * row_height)
-        if i in time_labels:
-            label_y = y - TIME_LABEL_Y_OFFSET
-            draw.text((TIME_LABEL_X, label_y), time_labels[i], font=fonts['time'], fill=BLACK)
+                text_jobs.append((text_x, text_y, task_title))
+    
+    # Flush buffered task fills into the pixel buffer (one vectorized
+    # store per rectangle), then switch to PIL for outlines and text
+    for gray_level, rects in rects_by_fill.items():
+        for x0, y0, x1, y1 in rects:
+            arr[y0:y1 + 1, x0:x1 + 1] = gray_level
+    image = Image.fromarray(arr, 'L')
+    draw = ImageDraw.Draw(image)
+    draw.text((title_x, TITLE_PADDING), week_title, font=fonts['title'], fill=BLACK)
+    for task_rect in outline_rects:
+        draw.rectangle(task_rect, outline=BLACK, width=1)
+    for text_x, text_y, task_title in text_jobs:
+        draw.text((text_x, text_y), task_title, font=fonts['task'], fill=BLACK)
     
     # Right panel - TODO and date
     available_height = height - (HEADER_HEIGHT + TITLE_PADDING + TITLE_FONT_SIZE + 5) - PANEL_MARGIN
@@ -307,10 +376,7 @@ def render_dual_weekly(data: Dict[str, Any], config: Dict[str, Any]) -> Image.Im
     square_size = max(0, min(right_width - PANEL_MARGIN, usable_height))
     square_start_y = HEADER_HEIGHT + TITLE_PADDING + TITLE_FONT_SIZE + 5
     square_rect = [right_x, square_start_y, right_x + square_size, square_start_y + square_size]
-    draw.rectangle(square_rect, outline=BLACK, width=1)
-    
-    # TODO title
-    draw.text((square_rect[0] + 6, square_rect[1] + 6), "TODO", font=fonts['day'], fill=BLACK)
+    # Box outline and "TODO" title are part of the cached background
     
     # TODO sections - extract tasks from todos
     today_date = today.date()
@@ -327,12 +393,6 @@ def render_dual_weekly(data: Dict[str, Any], config: Dict[str, Any]) -> Image.Im
     # If all instances of a parent are deleted, don't show the task
     daily_parent_instances = {}  # parent_id -> list of (instance_date, deleted_at)
     
-    # Get all tasks that are shown in calendar (to exclude them from TODO)
-    calendar_task_titles = set()
-    for day_tasks in tasks.values():
-        for task in day_tasks:
-            calendar_task_titles.add(task.get('title', ''))
-    
     # First pass: collect all daily task instances to check if parent is deleted
     for task in todos:
         section = task.get('section', '').lower()
@@ -359,11 +419,11 @@ def render_dual_weekly(data: Dict[str, Any], config: Dict[str, Any]) -> Image.Im
             # Check if instance_date is today or future
             if instance['instance_date']:
                 try:
-                    instance_date = datetime.strptime(instance['instance_date'], '%Y-%m-%d').date()
+                    instance_date = _parse_iso(instance['instance_date'])
                     if instance_date >= today_date:
                         has_valid_future_instance = True
                         break
-                except:
+                except (ValueError, TypeError):
                     pass
         if has_valid_future_instance:
             valid_daily_parent_ids.add(parent_id)
@@ -401,10 +461,10 @@ def render_dual_weekly(data: Dict[str, Any], config: Dict[str, Any]) -> Image.Im
                 continue
             # For daily tasks with instance_date, only show if instance_date is today or future
             try:
-                instance_date = datetime.strptime(task['instance_date'], '%Y-%m-%d').date()
+                instance_date = _parse_iso(task['instance_date'])
                 if instance_date < today_date:
                     continue  # Skip past instances
-            except:
+            except (ValueError, TypeError):
                 pass  # If parsing fails, continue with the task
         elif not is_daily_task and task.get('instance_date') and task.get('parent_task_id'):
             continue
@@ -418,20 +478,22 @@ def render_dual_weekly(data: Dict[str, Any], config: Dict[str, Any]) -> Image.Im
         end_time = task.get('end_time')
         has_time = start_time and end_time and start_time.strip() and end_time.strip() and start_time != 'null' and end_time != 'null'
         
-        # Parse task date for checking if it's in current week
+        # Skip scheduled tasks that are already shown in calendar (by title match)
+        # before spending any time parsing their dates
+        # Only check for scheduled tasks, not TODO tasks
+        if is_schedule and has_time and not is_daily_task and title in calendar_task_titles:
+            continue
+        
+        # Parse the task date lazily; tasks with an explicit section never need it
         task_date = None
-        if task.get('start_date'):
-            try:
-                task_date = datetime.strptime(task['start_date'], '%Y-%m-%d').date()
-            except:
-                pass
         
         # Handle scheduled tasks (is_schedule = true AND has time)
         if is_schedule and has_time:
-            # Skip scheduled tasks that are already shown in calendar (by title match)
-            # Only check for scheduled tasks, not TODO tasks
-            if not is_daily_task and title in calendar_task_titles:
-                continue
+            if task.get('start_date'):
+                try:
+                    task_date = _parse_iso(task['start_date'])
+                except (ValueError, TypeError):
+                    pass
             
             # Scheduled tasks with section "upcoming" should always show in TODO
             if section == 'upcoming':
@@ -449,12 +511,11 @@ def render_dual_weekly(data: Dict[str, Any], config: Dict[str, Any]) -> Image.Im
                         start_time_clean = start_time.strip()
                         if len(start_time_clean) > 5:
                             start_time_clean = start_time_clean[:5]
-                        start_parts = start_time_clean.split(':')
-                        start_h = int(start_parts[0])
+                        start_h, _ = _hm(start_time_clean)
                         # If task is in 8am-12am range, it's shown in calendar, skip from TODO
                         if start_h >= 8:
                             continue
-                    except:
+                    except (ValueError, TypeError):
                         pass
                     # Task is in current week but outside 8am-12am, include in TODO
                 # Task is outside current week, include in TODO
@@ -496,8 +557,8 @@ def render_dual_weekly(data: Dict[str, Any], config: Dict[str, Any]) -> Image.Im
             # Reuse task_date if already parsed, otherwise parse it
             if task_date is None and task.get('start_date'):
                 try:
-                    task_date = datetime.strptime(task['start_date'], '%Y-%m-%d').date()
-                except:
+                    task_date = _parse_iso(task['start_date'])
+                except (ValueError, TypeError):
                     pass
             
             if task_date:
@@ -539,8 +600,7 @@ def render_dual_weekly(data: Dict[str, Any], config: Dict[str, Any]) -> Image.Im
     date_weekday_line = f"{date_line} {weekday_abbr}"
     
     def center_text_y(base_y, text, font):
-        bbox = draw.textbbox((0, 0), text, font=font)
-        text_w = bbox[2] - bbox[0]
+        text_w = int(text_width(text, font))
         x = right_x + (right_width - text_w) // 2
         draw.text((x, base_y), text, font=font, fill=BLACK)
     
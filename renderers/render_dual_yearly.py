@@ -4,10 +4,14 @@ Dual Yearly View Renderer
 Yearly calendar showing 12 months in a grid
 """
 
-from PIL import Image, ImageDraw, ImageFont
-from datetime import datetime, timedelta
+from PIL import Image, ImageDraw
+from calendar import monthrange
+from datetime import date, datetime
+import numpy as np
 from typing import Dict, List, Any
 
+from renderers._fontcache import get_fonts
+
 # Display dimensions
 EPD_WIDTH = 800
 EPD_HEIGHT = 480
@@ -33,32 +37,29 @@ WHITE = 255
 BLACK = 0
 GRAY_LEVEL_3 = 192
 
-def days_in_month(dt):
-    """Get number of days in a month"""
-    first_day = dt.replace(day=1)
-    next_month = first_day.replace(day=28) + timedelta(days=4)
-    last_day = next_month - timedelta(days=next_month.day)
-    return last_day.day
+def _parse_iso(value):
+    """Parse a fixed-layout YYYY-MM-DD string; far cheaper than strptime"""
+    return date(int(value[0:4]), int(value[5:7]), int(value[8:10]))
+
+def _hm(value):
+    """Parse a fixed-layout HH:MM string without the split allocation"""
+    return int(value[0:2]), int(value[3:5])
 
-def calculate_hours_from_tasks(todos: List[Dict], month_date: datetime) -> Dict[int, float]:
-    """Calculate total hours per day from API tasks for a specific month"""
-    hours_by_day = {}
-    first_day = month_date.replace(day=1)
-    last_day = (first_day.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+def calculate_yearly_hours(todos: List[Dict], year: int) -> Dict[int, Dict[int, float]]:
+    """Calculate total hours per month and day from API tasks in one pass"""
+    yearly_hours = {month: {} for month in range(1, 13)}
     
     for task in todos:
         if not task.get('start_time') or not task.get('end_time') or not task.get('start_date'):
             continue
         
         try:
-            task_date = datetime.strptime(task['start_date'], '%Y-%m-%d')
-            if task_date < first_day or task_date > last_day:
+            task_date = _parse_iso(task['start_date'])
+            if task_date.year != year:
                 continue
             
-            start_parts = task['start_time'].split(':')
-            end_parts = task['end_time'].split(':')
-            start_h, start_m = int(start_parts[0]), int(start_parts[1])
-            end_h, end_m = int(end_parts[0]), int(end_parts[1])
+            start_h, start_m = _hm(task['start_time'])
+            end_h, end_m = _hm(task['end_time'])
             
             start_minutes = start_h * 60 + start_m
             end_minutes = end_h * 60 + end_m
@@ -66,30 +67,71 @@ def calculate_hours_from_tasks(todos: List[Dict], month_date: datetime) -> Dict[
                 end_minutes += 24 * 60
             
             duration_hours = (end_minutes - start_minutes) / 60.0
+            hours_by_day = yearly_hours[task_date.month]
             day = task_date.day
             hours_by_day[day] = hours_by_day.get(day, 0) + duration_hours
-        except Exception:
+        except (ValueError, TypeError):
             continue
     
-    return hours_by_day
+    return yearly_hours
+
+# Pooled pixel buffer, reused across refreshes so the long-lived device
+# process does not reallocate a 384 KB canvas every minute. The display
+# loop renders serially, so no locking is needed.
+_canvas_pool = {}
+
+def _get_canvas(height, width, fill):
+    key = (height, width)
+    arr = _canvas_pool.get(key)
+    if arr is None:
+        arr = np.empty((height, width), dtype=np.uint8)
+        _canvas_pool[key] = arr
+    arr[:] = fill
+    return arr
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; the plain kernel is fine without it
+    njit = None
+
+def _paint_year_cells(arr, has_hours, first_weekdays, total_days_arr,
+                      grid_top, grid_left, month_width, month_height,
+                      month_spacing, month_header_height, day_header_height,
+                      cell_spacing, gray):
+    """Fill the gray day cells for every month straight into the pixel buffer"""
+    for month_idx in range(12):
+        month_x = grid_left + (month_idx % 4) * (month_width + month_spacing)
+        month_y = grid_top + (month_idx // 4) * (month_height + month_spacing)
+        
+        cell_width = month_width / 7
+        cell_height = (month_height - month_header_height - day_header_height) / 6
+        start_y = month_y + month_header_height + day_header_height
+        cell_size = min(cell_width, cell_height) - cell_spacing * 2
+        
+        first_weekday = first_weekdays[month_idx]
+        for day in range(1, total_days_arr[month_idx] + 1):
+            if not has_hours[month_idx, day]:
+                continue
+            offset = first_weekday + (day - 1)
+            x0 = month_x + (offset % 7) * cell_width
+            y0 = start_y + (offset // 7) * cell_height
+            center_x = x0 + cell_width / 2
+            center_y = y0 + cell_height / 2
+            arr[int(center_y - cell_size / 2):int(center_y + cell_size / 2),
+                int(center_x - cell_size / 2):int(center_x + cell_size / 2)] = gray
+
+if njit is not None:
+    _paint_year_cells = njit(cache=True)(_paint_year_cells)
 
 def load_fonts():
-    """Load fonts with fallback"""
-    fonts = {}
+    """Load fonts with fallback via the shared per-process cache"""
     font_sizes = {
         'title': TITLE_FONT_SIZE,
         'month': MONTH_FONT_SIZE,
         'cell': CELL_FONT_SIZE,
     }
     
-    for name, path in FONT_PATHS.items():
-        size = font_sizes.get(name, 12)
-        try:
-            fonts[name] = ImageFont.truetype(path, size)
-        except:
-            fonts[name] = ImageFont.load_default()
-    
-    return fonts
+    return get_fonts(FONT_PATHS, font_sizes)
 
 def render_dual_yearly(data: Dict[str, Any], config: Dict[str, Any]) -> Image.Image:
     """
@@ -108,24 +150,40 @@ def render_dual_yearly(data: Dict[str, Any], config: Dict[str, Any]) -> Image.Im
     year = today.year
     year_title = str(year)
     
-    # Group tasks by month
-    yearly_hours = {}
-    for month in range(1, 13):
-        month_date = datetime(year, month, 1)
-        monthly_hours = calculate_hours_from_tasks(todos, month_date)
-        yearly_hours[month] = monthly_hours
+    # Group tasks by month and day in a single pass over the todos
+    yearly_hours = calculate_yearly_hours(todos, year)
     
     fonts = load_fonts()
     
     width = EPD_WIDTH
     height = EPD_HEIGHT
-    image = Image.new('L', (width, height), WHITE)
-    draw = ImageDraw.Draw(image)
-    
-    # Title
-    bbox = draw.textbbox((0, 0), year_title, font=fonts['title'])
-    title_x = (width - (bbox[2] - bbox[0])) // 2
-    draw.text((title_x, TITLE_PADDING), year_title, font=fonts['title'], fill=BLACK)
+
+    # Shaded day cells are painted into a NumPy canvas in one pass;
+    # text and bw frames are layered on with PIL afterwards
+    arr = _get_canvas(height, width, WHITE)
+
+    # Per-render cache for text measurements; repeated strings (day
+    # headers, day numbers) otherwise re-run FreeType shaping each time
+    _measure = ImageDraw.Draw(Image.new('L', (1, 1)))
+    _bbox_cache = {}
+
+    def text_bbox(text, font):
+        key = (id(font), text)
+        bbox = _bbox_cache.get(key)
+        if bbox is None:
+            bbox = _measure.textbbox((0, 0), text, font=font)
+            _bbox_cache[key] = bbox
+        return bbox
+
+    _width_cache = {}
+
+    def text_width(text, font):
+        key = (id(font), text)
+        w = _width_cache.get(key)
+        if w is None:
+            w = _measure.textlength(text, font=font)
+            _width_cache[key] = w
+        return w
     
     # Grid: 3 rows, 4 columns for 12 months
     grid_top = TITLE_PADDING + TITLE_FONT_SIZE + 5
@@ -142,7 +200,33 @@ def render_dual_yearly(data: Dict[str, Any], config: Dict[str, Any]) -> Image.Im
     cols = 7
     rows = 6
     
-    # Draw each month
+    text_jobs = []   # (x, y, text, font)
+    frame_rects = []  # bw-mode frames around days with tasks
+    
+    # Measure the repeated header strings once, outside the month loop
+    day_header_widths = [text_width(d, fonts['cell']) for d in day_names]
+    
+    month_geometry = [monthrange(year, month) for month in range(1, 13)]
+    month_header_height = MONTH_FONT_SIZE + 4
+    day_header_height = CELL_FONT_SIZE + DAY_HEADER_PADDING * 2
+    
+    if display_mode != 'bw':
+        # Gray day cells are painted by the grid kernel in one shot;
+        # numba compiles it when available, NumPy slicing covers the rest
+        has_hours = np.zeros((12, 32), dtype=np.bool_)
+        for month, monthly_hours in yearly_hours.items():
+            for day, hours in monthly_hours.items():
+                if hours > 0:
+                    has_hours[month - 1, day] = True
+        first_weekdays = np.array([g[0] for g in month_geometry], dtype=np.int64)
+        total_days_arr = np.array([g[1] for g in month_geometry], dtype=np.int64)
+        _paint_year_cells(arr, has_hours, first_weekdays, total_days_arr,
+                          float(grid_top), float(grid_left), month_width, month_height,
+                          float(MONTH_SPACING), float(month_header_height),
+                          float(day_header_height), float(CELL_SPACING),
+                          GRAY_LEVEL_3)
+    
+    # Lay out each month
     for month in range(1, 13):
         month_row = (month - 1) // month_cols
         month_col = (month - 1) % month_cols
@@ -150,36 +234,35 @@ def render_dual_yearly(data: Dict[str, Any], config: Dict[str, Any]) -> Image.Im
         month_x = grid_left + month_col * (month_width + MONTH_SPACING)
         month_y = grid_top + month_row * (month_height + MONTH_SPACING)
         
-        month_date = datetime(year, month, 1)
-        month_name = month_date.strftime("%b")
-        total_days = days_in_month(month_date)
-        first_weekday = month_date.weekday()
+        month_name = datetime(year, month, 1).strftime("%b")
+        first_weekday, total_days = month_geometry[month - 1]
         
         # Month title
-        month_bbox = draw.textbbox((0, 0), month_name, font=fonts['month'])
-        month_text_x = month_x + (month_width - (month_bbox[2] - month_bbox[0])) // 2
-        draw.text((month_text_x, month_y), month_name, font=fonts['month'], fill=BLACK)
+        month_text_x = month_x + (month_width - text_width(month_name, fonts['month'])) // 2
+        text_jobs.append((month_text_x, month_y, month_name, fonts['month']))
         
         # Calendar grid within month
-        month_header_height = MONTH_FONT_SIZE + 4
         calendar_top = month_y + month_header_height
         calendar_left = month_x
         calendar_width = month_width
         calendar_height = month_height - month_header_height
         
-        day_header_height = CELL_FONT_SIZE + DAY_HEADER_PADDING * 2
         cell_width = calendar_width / cols
         cell_height = (calendar_height - day_header_height) / rows
+        cell_size = min(cell_width, cell_height) - CELL_SPACING * 2
+        # Cells too small for a two-digit numeral get no day number at
+        # all, which skips the glyph shaping for the whole month
+        skip_digits = cell_size < 8
         
-        # Draw day headers
+        # Day headers
         day_header_y = calendar_top + DAY_HEADER_PADDING
         for i, day_name in enumerate(day_names):
             x = calendar_left + i * cell_width
-            day_bbox = draw.textbbox((0, 0), day_name, font=fonts['cell'])
-            text_x = x + (cell_width - (day_bbox[2] - day_bbox[0])) // 2
-            draw.text((text_x, day_header_y), day_name, font=fonts['cell'], fill=BLACK)
+            text_x = x + (cell_width - day_header_widths[i]) // 2
+            text_jobs.append((text_x, day_header_y, day_name, fonts['cell']))
         
-        # Draw calendar cells
+        # Calendar cells
+        monthly_hours = yearly_hours.get(month, {})
         start_y = calendar_top + day_header_height
         for day in range(1, total_days + 1):
             offset = first_weekday + (day - 1)
@@ -190,9 +273,8 @@ def render_dual_yearly(data: Dict[str, Any], config: Dict[str, Any]) -> Image.Im
             x1 = x0 + cell_width
             y1 = y0 + cell_height
             
-            hours = yearly_hours.get(month, {}).get(day, 0)
+            hours = monthly_hours.get(day, 0)
             
-            cell_size = min(cell_width, cell_height) - CELL_SPACING * 2
             center_x = (x0 + x1) / 2
             center_y = (y0 + y1) / 2
             rect = [
@@ -202,30 +284,30 @@ def render_dual_yearly(data: Dict[str, Any], config: Dict[str, Any]) -> Image.Im
                 int(center_y + cell_size / 2)
             ]
             
-            # Draw calendar cell based on mode
             if display_mode == 'bw':
-                # Black and white mode: use black text, add frame if has tasks
-                text_color = BLACK
+                # Black and white mode: add frame if has tasks
+                # (gray cells were painted by the grid kernel above)
                 if hours > 0:
-                    # Draw frame outside the date cell
-                    frame_rect = [
-                        rect[0] - 2,
-                        rect[1] - 2,
-                        rect[2] + 2,
-                        rect[3] + 2
-                    ]
-                    draw.rectangle(frame_rect, outline=BLACK, width=1)
-            else:
-                # 4-gray mode: use gray background for days with tasks
-                bg_color = GRAY_LEVEL_3 if hours > 0 else WHITE
-                draw.rectangle(rect, fill=bg_color, outline=None)
-                text_color = BLACK
+                    frame_rects.append([rect[0] - 2, rect[1] - 2, rect[2] + 2, rect[3] + 2])
             
             # Day number
-            day_label = str(day)
-            day_bbox = draw.textbbox((0, 0), day_label, font=fonts['cell'])
-            day_text_x = center_x - (day_bbox[2] - day_bbox[0]) / 2
-            day_text_y = center_y - (day_bbox[3] - day_bbox[1]) / 2
-            draw.text((day_text_x, day_text_y), day_label, font=fonts['cell'], fill=text_color)
+            if not skip_digits:
+                day_label = str(day)
+                day_bbox = text_bbox(day_label, fonts['cell'])
+                day_text_x = center_x - (day_bbox[2] - day_bbox[0]) / 2
+                day_text_y = center_y - (day_bbox[3] - day_bbox[1]) / 2
+                text_jobs.append((day_text_x, day_text_y, day_label, fonts['cell']))
+    
+    image = Image.fromarray(arr, 'L')
+    draw = ImageDraw.Draw(image)
+    
+    # Title
+    title_x = (width - int(text_width(year_title, fonts['title']))) // 2
+    draw.text((title_x, TITLE_PADDING), year_title, font=fonts['title'], fill=BLACK)
+    
+    for frame_rect in frame_rects:
+        draw.rectangle(frame_rect, outline=BLACK, width=1)
+    for x, y, text, font in text_jobs:
+        draw.text((x, y), text, font=font, fill=BLACK)
     
     return image
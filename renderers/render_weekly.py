@@ -46,6 +46,17 @@ BLACK = 0
 GRAY_LEVEL_1 = 80
 GRAY_LEVEL_3 = 192
 
+# Solid-gray source images for task fills, built on first 4-gray render;
+# pasting a crop of these is a bulk copy instead of per-rectangle drawing
+_gray_tiles = {}
+
+def _gray_tile(level):
+    tile = _gray_tiles.get(level)
+    if tile is None:
+        tile = Image.new('L', (EPD_WIDTH, EPD_HEIGHT), level)
+        _gray_tiles[level] = tile
+    return tile
+
 def transform_tasks_to_weekly_format(api_todos: List[Dict], week_start_date: datetime) -> Dict[str, List]:
     """Transform API tasks to weekly format"""
     tasks_by_day = {
@@ -276,12 +287,13 @@ def render_weekly(data: Dict[str, Any], config: Dict[str, Any]) -> Image.Image:
                 # Black and white mode: use outline only
                 draw.rectangle(task_rect, outline=BLACK, width=1)
             else:
-                # 4-gray mode: use fill only (like before)
+                # 4-gray mode: paste a crop of the solid tile (like before)
                 if duration_hours <= 1.0:
-                    draw.rectangle(task_rect, fill=GRAY_LEVEL_3, outline=None)
+                    gray_level = GRAY_LEVEL_3
                 else:
                     gray_level = GRAY_LEVEL_1 if duration_hours > 3.0 else GRAY_LEVEL_3
-                    draw.rectangle(task_rect, fill=gray_level, outline=None)
+                x0, y0, x1, y1 = task_rect
+                image.paste(_gray_tile(gray_level).crop((0, 0, x1 - x0 + 1, y1 - y0 + 1)), (x0, y0))
             
             # Draw task title if there's enough space
             task_title = task.get('title', '')
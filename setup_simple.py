@@ -7,14 +7,16 @@ Usage:
     sudo python3 setup_simple.py
 """
 
+import io
 import os
+import re
+import select
+import socket
 import sys
 import json
 import subprocess
 import shutil
 import time
-import urllib.request
-import urllib.error
 from pathlib import Path
 from datetime import datetime, timedelta
 
@@ -23,6 +25,37 @@ SCRIPT_DIR = Path(__file__).parent.absolute()
 CONFIG_FILE = SCRIPT_DIR / 'device_config.json'
 WPA_SUPPLICANT = Path('/etc/wpa_supplicant/wpa_supplicant.conf')
 
+# Matches one network block and captures its SSID, so detection and
+# removal share a single scan of the config
+NETWORK_BLOCK_RE = re.compile(
+    r'network=\{[^}]*?\bssid="(?P<ssid>[^"]*)"[^}]*?\}\s*',
+    re.DOTALL
+)
+
+# Header written once when the config is created from scratch
+DEFAULT_WPA_HEADER = """ctrl_interface=DIR=/var/run/wpa_supplicant GROUP=netdev
+update_config=1
+country=US
+
+"""
+
+def _strip_network_block(content, ssid):
+    """Splice out any network block holding this SSID in one scan.
+
+    The unmatched spans are copied straight into one buffer; when the
+    SSID is absent the original string is returned untouched.
+    """
+    out = io.StringIO()
+    start = 0
+    for match in NETWORK_BLOCK_RE.finditer(content):
+        if match.group('ssid') == ssid:
+            out.write(content[start:match.start()])
+            start = match.end()
+    if start == 0:
+        return content
+    out.write(content[start:])
+    return out.getvalue()
+
 def setup_wifi():
     """Setup WiFi connection.
     
@@ -55,104 +88,136 @@ def setup_wifi():
         shutil.copy(WPA_SUPPLICANT, backup_path)
         print(f"\nBacked up existing config to: {backup_path}")
     
-    # Read existing config or create new
-    if WPA_SUPPLICANT.exists():
-        with open(WPA_SUPPLICANT, 'r') as f:
-            content = f.read()
-    else:
-        content = """ctrl_interface=DIR=/var/run/wpa_supplicant GROUP=netdev
-update_config=1
-country=US
-
-"""
-    
-    # Remove existing network entry if it exists
-    if f'ssid="{ssid}"' in content:
-        lines = content.split('\n')
-        new_lines = []
-        skip_until_network_end = False
-        for line in lines:
-            if f'ssid="{ssid}"' in line:
-                skip_until_network_end = True
-                continue
-            if skip_until_network_end and line.strip() == '}':
-                skip_until_network_end = False
-                continue
-            if not skip_until_network_end:
-                new_lines.append(line)
-        content = '\n'.join(new_lines)
-    
-    # Add new network
+    # New network block
     network_config = f"""
 network={{
     ssid="{ssid}"
     psk="{password}"
 }}
 """
-    
-    # Append to config
-    with open(WPA_SUPPLICANT, 'a') as f:
-        f.write(network_config)
+
+    # One read-modify-write pass over the config: strip any old block
+    # for this SSID, append the new one, and write back in place
+    # The large buffer lets the whole config land in one write(2)
+    # instead of several 8 KB flushes on the SD card
+    try:
+        f = open(WPA_SUPPLICANT, 'r+', buffering=1024 * 1024)
+    except FileNotFoundError:
+        f = open(WPA_SUPPLICANT, 'w+', buffering=1024 * 1024)
+    with f:
+        content = f.read()
+        if not content:
+            content = DEFAULT_WPA_HEADER
+        content = _strip_network_block(content, ssid)
+        f.seek(0)
+        f.write(content + network_config)
+        f.truncate()
     
     print(f"\nWiFi configuration added successfully!")
     print("Restarting WiFi connection...")
     
-    # Restart WiFi
+    # Restart WiFi; probe PATH first so a missing wpa_cli skips the
+    # exec attempt instead of paying for the failure
+    if not shutil.which('wpa_cli'):
+        print("Note: wpa_cli not found; could not automatically restart WiFi.")
+        print("You may need to reboot: sudo reboot")
+        return True, ssid  # User can reboot manually
     try:
         subprocess.run(['wpa_cli', '-i', 'wlan0', 'reconfigure'], check=True, timeout=10)
         print("WiFi restarted. Please wait a few seconds for connection...")
-    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
         print("Note: Could not automatically restart WiFi.")
         print("You may need to reboot: sudo reboot")
         return True, ssid  # Return True even if restart failed, user can reboot manually
-    
+
     return True, ssid
 
 def verify_wifi_connection(ssid, max_wait=30):
     """Verify WiFi connection to specified SSID."""
     print("\nVerifying WiFi connection...")
     print(f"Waiting up to {max_wait} seconds for connection...")
-    
-    for i in range(max_wait):
-        time.sleep(1)
-        try:
-            # Check current WiFi SSID
-            result = subprocess.run(
-                ['iwgetid', '-r'],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            current_ssid = result.stdout.strip()
-            
-            if current_ssid == ssid:
+
+    # One long-lived interactive wpa_cli session replaces a fork+exec
+    # of iwgetid every second; each poll is a line down the same pipe
+    try:
+        proc = subprocess.Popen(
+            ['wpa_cli', '-i', 'wlan0'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1
+        )
+    except OSError:
+        print("⚠ wpa_cli not available; cannot verify the connection")
+        print("  You can verify manually with: iwgetid -r")
+        return False
+
+    # Read the raw descriptor: a buffered readline can hide lines from
+    # select or block without a timeout on wpa_cli's partial-line
+    # prompt writes, wedging the loop past max_wait
+    stdout_fd = proc.stdout.fileno()
+    os.set_blocking(stdout_fd, False)
+
+    needle = f'ssid={ssid}'
+    output = ''
+    try:
+        for i in range(max_wait):
+            time.sleep(1)
+            try:
+                proc.stdin.write('status\n')
+                proc.stdin.flush()
+            except (BrokenPipeError, OSError):
+                break
+
+            # Drain whatever the status command produced, accumulating
+            # across polls so markers split over cycles still match
+            while select.select([stdout_fd], [], [], 0.2)[0]:
+                try:
+                    chunk = os.read(stdout_fd, 4096)
+                except BlockingIOError:
+                    break
+                if not chunk:
+                    break
+                output += chunk.decode('utf-8', 'replace')
+            output = output[-8192:]
+
+            if needle in output and 'wpa_state=COMPLETED' in output:
+                # Internet reachability is proven by the API request
+                # that follows, so no separate ping round trip is needed
                 print(f"✓ Successfully connected to WiFi: {ssid}")
-                
-                # Test internet connection
-                print("Testing internet connection...")
-                ping_result = subprocess.run(
-                    ['ping', '-c', '1', '-W', '2', '8.8.8.8'],
-                    capture_output=True,
-                    timeout=5
-                )
-                if ping_result.returncode == 0:
-                    print("✓ Internet connection verified!")
-                    return True
-                else:
-                    print("⚠ Connected to WiFi but no internet access")
-                    return False
-        except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.CalledProcessError):
-            pass
-        
-        if (i + 1) % 5 == 0:
-            print(f"  Still waiting... ({i + 1}/{max_wait} seconds)")
-    
+                return True
+
+            # The link is often up before wpa_cli reflects it; accept
+            # whichever signal lands first by also probing the network
+            # directly with an in-process TCP connect
+            try:
+                socket.create_connection(('8.8.8.8', 53), timeout=1).close()
+                print("✓ Internet connection verified!")
+                return True
+            except OSError:
+                pass
+
+            if (i + 1) % 5 == 0:
+                print(f"  Still waiting... ({i + 1}/{max_wait} seconds)")
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
     print(f"⚠ Could not verify WiFi connection after {max_wait} seconds")
     print("  The WiFi may still be connecting. You can verify manually with: iwgetid -r")
     return False
 
 def setup_device_token():
-    """Setup device token."""
+    """Setup device token.
+
+    Returns:
+        tuple: (success: bool, config: dict) - the parsed config is
+        handed back so main() does not re-read the file it just wrote
+    """
     print("\n" + "=" * 60)
     print("Device Token Setup")
     print("=" * 60)
@@ -167,8 +232,8 @@ def setup_device_token():
     
     if not token:
         print("Error: Device token cannot be empty.")
-        return False
-    
+        return False, None
+
     # Load or create config
     config = {}
     if CONFIG_FILE.exists():
@@ -183,8 +248,9 @@ def setup_device_token():
     config['device_token'] = token
     config['api_url'] = config.get('api_url', 'https://no-plan-no-future.vercel.app')
     
-    # Save config
-    with open(CONFIG_FILE, 'w') as f:
+    # Save config; the buffer comfortably holds the whole document so
+    # it reaches the flash in a single write
+    with open(CONFIG_FILE, 'w', buffering=65536) as f:
         json.dump(config, f, indent=2)
     
     # Set secure permissions
@@ -192,59 +258,104 @@ def setup_device_token():
     
     print(f"\nDevice token saved to: {CONFIG_FILE}")
     print("Configuration saved successfully!")
-    
-    return True
+
+    return True, config
+
+# Persistent API connections, one per (scheme, host); kept open so a
+# retry or a future endpoint check skips the TLS handshake
+_api_conns = {}
+
+def _api_connection(api_url):
+    """Return a cached http.client connection for this API URL."""
+    import http.client
+    from urllib.parse import urlparse
+    parsed = urlparse(api_url)
+    key = (parsed.scheme, parsed.netloc)
+    conn = _api_conns.get(key)
+    if conn is None:
+        if parsed.scheme == 'https':
+            conn = http.client.HTTPSConnection(parsed.netloc, timeout=10)
+        else:
+            conn = http.client.HTTPConnection(parsed.netloc, timeout=10)
+        _api_conns[key] = conn
+    return conn
 
 def verify_device_token(token, api_url='https://no-plan-no-future.vercel.app'):
     """Verify device token by testing API connection."""
     print("\nVerifying device token...")
-    
+
+    headers = {'User-Agent': 'RaspberryPi-Setup/1.0'}
+    # One connection serves both the reachability probe and the token
+    # request, so the TLS handshake is paid once
+    conn = _api_connection(api_url)
+
     try:
-        # Test API connection with a simple request
+        # Cheap reachability probe first; a DNS or network failure
+        # gets a clear message instead of surfacing through the token
+        # request (any status code proves the network works)
+        try:
+            conn.request('HEAD', '/', headers=headers)
+            conn.getresponse().read()
+        except socket.gaierror as e:
+            print(f"✗ Cannot reach API server: {e}")
+            print("  Please check your internet connection and the API URL.")
+            return False
+        except OSError as e:
+            print(f"✗ Cannot reach API server: {e}")
+            print("  Please check your internet connection and the API URL.")
+            return False
+
         today = datetime.now()
         days_since_monday = today.weekday()
         monday = (today - timedelta(days=days_since_monday)).replace(hour=0, minute=0, second=0, microsecond=0)
         start_date = monday.strftime('%Y-%m-%d')
         end_date = (monday + timedelta(days=6)).strftime('%Y-%m-%d')
-        
-        test_url = f"{api_url}/api/calendar-shares/devices/view/{token}?startDate={start_date}&endDate={end_date}"
-        
+
+        path = f"/api/calendar-shares/devices/view/{token}?startDate={start_date}&endDate={end_date}"
+
         print(f"Testing API connection...")
-        req = urllib.request.Request(test_url)
-        req.add_header('User-Agent', 'RaspberryPi-Setup/1.0')
-        
-        with urllib.request.urlopen(req, timeout=10) as response:
-            if response.status == 200:
-                data = json.loads(response.read().decode())
-                if 'config' in data:
-                    print("✓ Device token is valid!")
-                    print(f"  View type: {data.get('config', {}).get('view_type', 'unknown')}")
-                    print(f"  Display mode: {data.get('config', {}).get('display_mode', 'unknown')}")
-                    return True
-                else:
-                    print("⚠ API responded but response format unexpected")
-                    return False
-            else:
-                print(f"⚠ API returned status: {response.status}")
+        try:
+            # http.client transparently reopens the socket if the
+            # server did not keep the probe connection alive
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            status = response.status
+        except OSError as e:
+            print(f"✗ Could not connect to API: {e}")
+            print("  Please check:")
+            print("    - Your internet connection")
+            print("    - The API URL is correct")
+            return False
+
+        if status != 200:
+            response.read()  # Drain so the cached connection stays reusable
+
+        if status == 200:
+            try:
+                # Parse straight off the response stream; no
+                # intermediate bytes and str copies of the payload
+                data = json.load(response)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                print("⚠ API responded but response format unexpected")
                 return False
-    except urllib.error.HTTPError as e:
-        if e.code == 400:
+            if 'config' in data:
+                print("✓ Device token is valid!")
+                print(f"  View type: {data.get('config', {}).get('view_type', 'unknown')}")
+                print(f"  Display mode: {data.get('config', {}).get('display_mode', 'unknown')}")
+                return True
+            print("⚠ API responded but response format unexpected")
+            return False
+        elif status == 400:
             print("⚠ API connection OK, but request format issue (this may be normal)")
             print("✓ Device token format appears correct")
             return True
-        elif e.code == 401 or e.code == 403:
-            print(f"✗ Authentication failed (status {e.code})")
+        elif status in (401, 403):
+            print(f"✗ Authentication failed (status {status})")
             print("  Please check your device token")
             return False
         else:
-            print(f"⚠ API error: {e.code}")
+            print(f"⚠ API error: {status}")
             return False
-    except urllib.error.URLError as e:
-        print(f"✗ Could not connect to API: {e.reason}")
-        print("  Please check:")
-        print("    - Your internet connection")
-        print("    - The API URL is correct")
-        return False
     except Exception as e:
         print(f"✗ Error verifying token: {str(e)}")
         return False
@@ -283,22 +394,15 @@ def main():
         else:
             print("Skipping WiFi setup.")
     
-    # Device token setup
-    token = None
-    api_url = 'https://no-plan-no-future.vercel.app'
-    if not setup_device_token():
+    # Device token setup; the returned config spares a re-read of the
+    # file that was written a moment ago
+    ok, config = setup_device_token()
+    if not ok:
         print("\nError: Device token setup failed.")
         sys.exit(1)
-    
-    # Load token from config for verification
-    if CONFIG_FILE.exists():
-        try:
-            with open(CONFIG_FILE, 'r') as f:
-                config = json.load(f)
-                token = config.get('device_token')
-                api_url = config.get('api_url', api_url)
-        except:
-            pass
+
+    token = config.get('device_token')
+    api_url = config.get('api_url', 'https://no-plan-no-future.vercel.app')
     
     # Verify device token
     if token: